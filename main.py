@@ -1,12 +1,27 @@
+import asyncio
+import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import torch
-import pickle
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel
+from safetensors.torch import load_file
+from algosdk import account, encoding, mnemonic, transaction
 from algosdk.v2client import indexer
 from torch_geometric.nn import SAGEConv
+from train import create_graph_data
 import torch.nn.functional as F
 import subprocess
 import sys
+
+# Optional: ONNX Runtime backend for the dense fast path (enabled with USE_ONNX=1)
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
 # --- 1. Model Definition (Must match training architecture) ---
 class FraudGNN(torch.nn.Module):
     def __init__(self, in_channels=5, hidden_channels=16):
@@ -18,7 +33,42 @@ class FraudGNN(torch.nn.Module):
         x = self.conv1(x, edge_index).relu()
         x = F.dropout(x, p=0.5, training=self.training)
         x = self.conv2(x, edge_index)
-        return F.log_softmax(x, dim=1)
+        # Serving only needs probabilities; train.py keeps log_softmax for its nll_loss
+        return F.softmax(x, dim=1)
+
+class DenseFraudGNN(torch.nn.Module):
+    """FraudGNN specialized to one fixed graph.
+
+    SAGEConv's mean aggregation over a static edge_index is a matmul with the
+    row-normalized adjacency matrix, so the forward pass becomes a few dense
+    GEMMs instead of PyG's gather/scatter message passing.
+    """
+    def __init__(self, model, edge_index, num_nodes):
+        super(DenseFraudGNN, self).__init__()
+        # adj[i, j] = (#edges j -> i) / in_degree(i); rows of isolated nodes stay zero
+        src, dst = edge_index
+        adj = torch.zeros(num_nodes, num_nodes)
+        adj.index_put_((dst, src), torch.ones(src.numel()), accumulate=True)
+        self.register_buffer("adj", adj / adj.sum(dim=1, keepdim=True).clamp(min=1))
+
+        self.lin1_l = self._to_linear(model.conv1.lin_l)
+        self.lin1_r = self._to_linear(model.conv1.lin_r)
+        self.lin2_l = self._to_linear(model.conv2.lin_l)
+        self.lin2_r = self._to_linear(model.conv2.lin_r)
+
+    @staticmethod
+    def _to_linear(lin):
+        linear = torch.nn.Linear(lin.in_channels, lin.out_channels, bias=lin.bias is not None)
+        with torch.no_grad():
+            linear.weight.copy_(lin.weight)
+            if lin.bias is not None:
+                linear.bias.copy_(lin.bias)
+        return linear
+
+    def forward(self, x):
+        x = (self.lin1_l(self.adj @ x) + self.lin1_r(x)).relu()
+        x = self.lin2_l(self.adj @ x) + self.lin2_r(x)
+        return F.softmax(x, dim=1)
 
 # --- 2. FastAPI Setup & Resource Loading ---
 app = FastAPI(title="Algorand AI Fraud Detection Service")
@@ -26,25 +76,124 @@ app = FastAPI(title="Algorand AI Fraud Detection Service")
 # Global state to hold model, mapping, and the full graph context
 state = {}
 
+# Set FAST_FORWARD=0 to serve from the full PyG model (e.g. to check the dense path against it)
+FAST_FORWARD = os.environ.get("FAST_FORWARD", "1") == "1"
+# Set USE_BF16=1 to run inference in bfloat16 (only applied when the CPU has native bf16 kernels)
+USE_BF16 = os.environ.get("USE_BF16", "0") == "1"
+
+# Set USE_INT8=1 to dynamically quantize the dense fast path's Linear layers to int8
+USE_INT8 = os.environ.get("USE_INT8", "0") == "1"
+
+# Set USE_ONNX=1 to serve the dense fast path from an ONNX Runtime session (requires onnxruntime)
+USE_ONNX = os.environ.get("USE_ONNX", "0") == "1"
+ONNX_PATH = "fraud.onnx"
+
+def bf16_supported():
+    """True when oneDNN can run bfloat16 natively (e.g. AVX512-BF16/AMX) instead of emulating it."""
+    return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+
+def compile_for_inference(model, *example_inputs):
+    """Script, freeze and optimize the model for inference, then warm it up; falls back to eager on failure."""
+    try:
+        # Freezing inlines the weights as constants and drops the training-only dropout branch
+        frozen = torch.jit.freeze(torch.jit.script(model.eval()))
+        scripted = torch.jit.optimize_for_inference(frozen)
+        # Warm-up call so the first-iteration compile cost is paid at startup, not on the first request
+        with torch.inference_mode():
+            scripted(*example_inputs)
+        return scripted
+    except Exception as e:
+        print(f"⚠ TorchScript compilation failed, using eager model: {e}")
+        return model
+
+def load_onnx_session(model, x):
+    """Export the model to ONNX and open a CPU ONNX Runtime session; returns None on failure."""
+    try:
+        torch.onnx.export(model, (x,), ONNX_PATH, input_names=["x"], output_names=["probs"],
+                          opset_version=17, dynamo=False)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = 1
+        session = ort.InferenceSession(ONNX_PATH, options, providers=["CPUExecutionProvider"])
+        session.run(None, {"x": x.numpy()})
+        return session
+    except Exception as e:
+        print(f"⚠ ONNX Runtime export failed, using the TorchScript model: {e}")
+        return None
+
 @app.on_event("startup")
 def load_resources():
     try:
+        # Inference is a handful of tiny matmuls; extra intra-op threads only add sync overhead
+        torch.set_num_threads(1)
+
         # Load Algorand Indexer (Testnet example)
         state["algo_indexer"] = indexer.IndexerClient("", "https://testnet-idx.algonode.cloud", "")
         
-        # Load LabelEncoder
-        with open("label_encoder.pkl", "rb") as f:
-            state["encoder"] = pickle.load(f)
-        
         # Load Model
         state["model"] = FraudGNN(in_channels=5)
-        state["model"].load_state_dict(torch.load("model.pt", map_location=torch.device('cpu')))
+        # safetensors is memory-mapped and, unlike torch.load's pickle, runs no code
+        state["model"].load_state_dict(load_file("model.safetensors", device="cpu"))
         state["model"].eval()
 
         # FIX: Load the full graph data used during training for inference context
         # This prevents the "All 1.0" risk score by providing real neighbor data
-        from train import create_graph_data
-        state["full_graph_data"], _ = create_graph_data("algorand_fraud_dataset.csv")
+        state["full_graph_data"], encoder = create_graph_data("algorand_fraud_dataset.csv")
+
+        # Wallet -> graph id lookup from the encoder fit on the same CSV, so no pickled
+        # LabelEncoder is loaded and requests do a single dict.get instead of transform
+        state["addr_to_idx"] = {addr: idx for idx, addr in enumerate(encoder.classes_)}
+
+        # Keep the inference inputs as plain contiguous tensors so requests don't
+        # rebuild or re-resolve them through the PyG Data container
+        full_data = state["full_graph_data"]
+        state["x"] = full_data.x.contiguous()
+        state["edge_index"] = full_data.edge_index.contiguous()
+
+        # Build the dense fast path from the eager float32 weights and check it against the PyG model
+        dense = None
+        if FAST_FORWARD:
+            dense = DenseFraudGNN(state["model"], state["edge_index"], state["x"].size(0)).eval()
+            with torch.inference_mode():
+                reference = state["model"](state["x"], state["edge_index"])
+                if not torch.allclose(dense(state["x"]), reference, atol=1e-4):
+                    print("⚠ Dense forward does not match the PyG model, serving from the full model.")
+                    dense = None
+
+        # Optionally halve weight/activation bytes with bfloat16 on CPUs that support it natively
+        if USE_BF16:
+            if bf16_supported():
+                state["model"] = state["model"].to(torch.bfloat16)
+                if dense is not None:
+                    dense = dense.to(torch.bfloat16)
+                state["x"] = state["x"].to(torch.bfloat16)
+            else:
+                print("⚠ No native bfloat16 support on this CPU, keeping float32 inference.")
+
+        # PyG's scatter-based message passing doesn't export cleanly, but the dense path is plain matmuls
+        if USE_ONNX:
+            if ort is None:
+                print("⚠ USE_ONNX is set but onnxruntime is not installed.")
+            elif dense is not None and state["x"].dtype == torch.float32:
+                state["ort_session"] = load_onnx_session(dense, state["x"])
+                state["x_np"] = state["x"].numpy()
+            else:
+                print("⚠ USE_ONNX needs the float32 dense fast path (FAST_FORWARD=1, no bf16), serving from TorchScript.")
+
+        # PyG's SAGEConv uses its own Linear class, so only the dense path (plain nn.Linear) can be
+        # swapped for FBGEMM's int8 dynamic-quantized kernels; those expect float32 activations
+        if USE_INT8:
+            if state.get("ort_session") is not None:
+                print("⚠ USE_INT8 is ignored because the ONNX Runtime session takes precedence.")
+            elif dense is not None and state["x"].dtype == torch.float32:
+                dense = torch.ao.quantization.quantize_dynamic(dense, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                print("⚠ USE_INT8 needs the float32 dense fast path (FAST_FORWARD=1, no bf16), keeping float weights.")
+
+        # Compile the models once the graph context is available for the warm-up pass
+        if dense is not None:
+            state["dense_model"] = compile_for_inference(dense, state["x"])
+        state["model"] = compile_for_inference(state["model"], state["x"], state["edge_index"])
         
         print("✅ AI Resources and Graph Context Loaded Successfully.")
     except Exception as e:
@@ -52,15 +201,160 @@ def load_resources():
         # In production, you might not want to crash the whole app if one resource fails
         # but for this POC, it's better to know early.
 
+# --- 2b. Inference Micro-Batching ---
+# Requests arriving within a short window share a single forward pass over the graph
+MAX_BATCH = 32
+MAX_WAIT_MS = 2
+
+# The forward pass runs on a worker thread so it never blocks the event loop. The batcher
+# keeps at most one forward in flight, so a single worker is enough; torch's intra-op
+# threads are capped at 1 (in load_resources) to avoid oversubscribing the small matmuls.
+INFER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+def run_model():
+    """Forward pass over the full graph context; returns per-node class probabilities."""
+    if state.get("ort_session") is not None:
+        return torch.from_numpy(state["ort_session"].run(None, {"x": state["x_np"]})[0])
+    if state.get("dense_model") is not None:
+        return state["dense_model"](state["x"])
+    return state["model"](state["x"], state["edge_index"])
+
+def run_inference_sync():
+    """Blocking forward pass for INFER_POOL; returns per-node class probabilities."""
+    # inference_mode is stricter than no_grad: it also skips view/version-counter bookkeeping
+    with torch.inference_mode():
+        return run_model()
+
+async def inference_batcher():
+    """Background coroutine: coalesces queued wallet lookups into one model forward."""
+    queue = state["inference_queue"]
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            probs = await loop.run_in_executor(INFER_POOL, run_inference_sync)
+            for future, wallet_idx in batch:
+                if not future.done():
+                    # Extract the fraud probability (Class 1) for this specific wallet
+                    future.set_result(float(probs[wallet_idx][1]))
+        except Exception as e:
+            for future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+async def submit(wallet_idx):
+    """Queues a wallet for the next batched forward pass and waits for its risk score."""
+    future = asyncio.get_running_loop().create_future()
+    await state["inference_queue"].put((future, wallet_idx))
+    return await future
+
+@app.on_event("startup")
+async def start_inference_batcher():
+    state["inference_queue"] = asyncio.Queue()
+    state["inference_batcher"] = asyncio.create_task(inference_batcher())
+
+@app.on_event("shutdown")
+async def stop_inference_batcher():
+    # The batcher loops forever on queue.get(); cancel it so shutdown leaves no pending task
+    task = state.pop("inference_batcher", None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+# --- 2c. Risk Score Cache ---
+# The graph context is static between restarts, so a wallet's score only changes
+# when the model or graph is reloaded. Entries expire after SCORE_CACHE_TTL seconds.
+SCORE_CACHE_TTL = 60
+SCORE_CACHE_MAXSIZE = 10_000
+score_cache = {}
+
+def get_cached_score(wallet):
+    entry = score_cache.get(wallet)
+    if entry is None:
+        return None
+    expires_at, risk_score = entry
+    if expires_at < time.monotonic():
+        del score_cache[wallet]
+        return None
+    return risk_score
+
+def cache_score(wallet, risk_score):
+    # Re-insert so dict order tracks expiry; the oldest entry is evicted when full
+    score_cache.pop(wallet, None)
+    if len(score_cache) >= SCORE_CACHE_MAXSIZE:
+        del score_cache[next(iter(score_cache))]
+    score_cache[wallet] = (time.monotonic() + SCORE_CACHE_TTL, risk_score)
+
 # --- 3. Request Schemas ---
 class FraudCheck(BaseModel):
     wallet_address: str
     asset_id: int
 
 # --- 4. Logic Functions ---
-def trigger_blockchain_freeze(wallet: str, asset_id: int):
+# Algod node used to submit freeze transactions, and the asset freeze manager's mnemonic.
+# Without FREEZE_MNEMONIC the freeze is only logged (POC mode).
+ALGOD_URL = os.environ.get("ALGOD_URL", "https://testnet-api.algonode.cloud")
+FREEZE_MNEMONIC = os.environ.get("FREEZE_MNEMONIC")
+
+# One shared client (and connection pool) so freeze tasks don't each pay TCP + TLS setup
+ASYNC_HTTP = httpx.AsyncClient(base_url=ALGOD_URL, timeout=10.0)
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await ASYNC_HTTP.aclose()
+
+async def trigger_blockchain_freeze(wallet: str, asset_id: int):
     """Background Task: Triggers an asset freeze on the Algorand blockchain."""
     print(f"!!! BLOCKCHAIN ACTION: Freezing Asset {asset_id} for wallet {wallet} !!!")
+    if FREEZE_MNEMONIC is None:
+        return
+
+    # Demo graph ids (MULE_*, GOVT_*) aren't on-chain accounts; don't hit algod for them
+    if not encoding.is_valid_address(wallet):
+        print(f"⚠ Skipping freeze: {wallet} is not a valid Algorand address.")
+        return
+
+    try:
+        response = await ASYNC_HTTP.get("/v2/transactions/params")
+        response.raise_for_status()
+        params = response.json()
+        sp = transaction.SuggestedParams(
+            fee=params["min-fee"],
+            first=params["last-round"],
+            last=params["last-round"] + 1000,
+            gh=params["genesis-hash"],
+            gen=params["genesis-id"],
+            flat_fee=True
+        )
+
+        # Building and signing the AssetFreeze transaction is CPU-only; just the two HTTP calls await
+        private_key = mnemonic.to_private_key(FREEZE_MNEMONIC)
+        freeze_manager = account.address_from_private_key(private_key)
+        txn = transaction.AssetFreezeTxn(freeze_manager, sp, asset_id, wallet, True)
+        signed_txn = txn.sign(private_key)
+
+        response = await ASYNC_HTTP.post(
+            "/v2/transactions",
+            content=base64.b64decode(encoding.msgpack_encode(signed_txn)),
+            headers={"Content-Type": "application/x-binary"}
+        )
+        response.raise_for_status()
+        print(f"✓ Freeze transaction submitted: {response.json()['txId']}")
+    except Exception as e:
+        print(f"❌ ERROR freezing asset {asset_id} for wallet {wallet}: {e}")
 
 # --- 5. API Endpoints ---
 
@@ -75,28 +369,27 @@ def health():
 
 @app.post("/analyze-wallet")
 async def analyze_wallet(data: FraudCheck, background_tasks: BackgroundTasks):
-    # Step A: Check if encoder exists
-    if state.get("encoder") is None:
+    # Step A: Check if the wallet lookup exists
+    if state.get("addr_to_idx") is None:
         raise HTTPException(status_code=503, detail="Model encoder not ready.")
 
-    # Step B: Map wallet to internal Graph ID
-    try:
-        wallet_idx = state["encoder"].transform([data.wallet_address])[0]
-    except ValueError:
-        # FIX: Explicitly raise 404 so it isn't caught by the general 500 error block
-        raise HTTPException(status_code=404, detail="Wallet address not found in historical graph data.")
+    # Step B: Reuse a recent score; only known wallets are ever cached
+    risk_score = get_cached_score(data.wallet_address)
+
+    if risk_score is None:
+        # Map wallet to internal Graph ID
+        wallet_idx = state["addr_to_idx"].get(data.wallet_address)
+        if wallet_idx is None:
+            # FIX: Explicitly raise 404 so it isn't caught by the general 500 error block
+            raise HTTPException(status_code=404, detail="Wallet address not found in historical graph data.")
 
     try:
-        # Step C: Run AI Inference using the full trained graph context
-        full_data = state["full_graph_data"]
-        
-        with torch.no_grad():
-            # The model analyzes the node within the context of the entire network
-            output = state["model"](full_data.x, full_data.edge_index)
-            probs = torch.exp(output)
-            
-            # Extract the fraud probability (Class 1) for this specific wallet
-            risk_score = float(probs[wallet_idx][1])
+        if risk_score is None:
+            # Step C: Run AI Inference using the full trained graph context
+            # The model analyzes the node within the context of the entire network;
+            # concurrent requests are batched into a single forward pass
+            risk_score = await submit(wallet_idx)
+            cache_score(data.wallet_address, risk_score)
 
         # Step D: Determine Action
         decision = "CLEAR"
@@ -125,7 +418,6 @@ async def analyze_wallet(data: FraudCheck, background_tasks: BackgroundTasks):
 def run_tests():
     try:
         # Use env to force UTF-8 for the subprocess
-        import os
         env = os.environ.copy()
         env["PYTHONIOENCODING"] = "utf-8"
 
@@ -149,6 +441,5 @@ def run_tests():
 if __name__ == "__main__":
     import uvicorn
     # Use $PORT for compatibility with cloud services like Render
-    import os
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
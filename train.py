@@ -1,52 +1,36 @@
 import torch
 import pickle
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 from torch_geometric.data import Data
 import torch.nn.functional as F
 from torch_geometric.nn import SAGEConv
-
-# --- 1. Generate Dataset ---
-print("Step 1: Generating dataset...")
-import random
-import uuid
+from safetensors.torch import save_file
 
 def generate_dummy_data(entries=200):
-    data = []
-    mule_wallets = [f"MULE_{i}" for i in range(10)]
-    normal_wallets = [f"STU_{i}" for i in range(50)]
+    # Draw every column with one vectorized call instead of a Python loop per row
+    rng = np.random.default_rng()
+    # Roles: NGO (Source), Student (Normal), Mule (Fraud), Hub (Collector)
+    mule_wallets = np.array([f"MULE_{i}" for i in range(10)])
+    normal_wallets = np.array([f"STU_{i}" for i in range(50)])
     hub_wallet = "HUB_COLLECTOR_01"
     ngo_wallet = "GOVT_SCHOLARSHIP_DEPT"
 
-    for i in range(entries):
-        if random.random() > 0.2:
-            sender = ngo_wallet
-            receiver = random.choice(normal_wallets)
-            amount = random.randint(1000, 5000)
-            label = 0
-        else:
-            sender = random.choice(mule_wallets)
-            receiver = hub_wallet
-            amount = random.randint(100, 500)
-            label = 1
-
-        data.append({
-            "tx_id": str(uuid.uuid4())[:8],
-            "sender": sender,
-            "receiver": receiver,
-            "amount": amount,
-            "timestamp": f"2026-02-{random.randint(1,28)}",
-            "is_fraud": label
-        })
-    
-    return pd.DataFrame(data)
-
-df = generate_dummy_data(210)
-df.to_csv("algorand_fraud_dataset.csv", index=False)
-print(f"✓ Dataset created: {len(df)} transactions")
-
-# --- 2. Create Graph Data ---
-print("\nStep 2: Converting to graph format...")
+    # 80% Normal Transactions, 20% Many-to-One "smurfing" into the hub
+    is_fraud = rng.random(entries) <= 0.2
+    sender = np.where(is_fraud, rng.choice(mule_wallets, entries), ngo_wallet)
+    receiver = np.where(is_fraud, hub_wallet, rng.choice(normal_wallets, entries))
+    amount = np.where(is_fraud, rng.integers(100, 501, entries), rng.integers(1000, 5001, entries))
+
+    return pd.DataFrame({
+        "tx_id": np.char.mod("%08x", rng.integers(0, 2**32, entries)),
+        "sender": sender,
+        "receiver": receiver,
+        "amount": amount,
+        "timestamp": np.char.add("2026-02-", rng.integers(1, 29, entries).astype(str)),
+        "is_fraud": is_fraud.astype(int)
+    })
 
 def create_graph_data(csv_path):
     df = pd.read_csv(csv_path)
@@ -59,37 +43,40 @@ def create_graph_data(csv_path):
     # Create Edge Index
     src = le.transform(df['sender'])
     dst = le.transform(df['receiver'])
-    edge_index = torch.tensor([src, dst], dtype=torch.long)
+    edge_index = torch.from_numpy(np.stack([src, dst]).astype(np.int64))
     
+    # Aggregate per-wallet stats in one pass over the transactions
+    # instead of re-filtering the whole frame for every wallet
+    in_degree = df['receiver'].value_counts()
+    out_degree = df['sender'].value_counts()
+    avg_sent = df.groupby('sender')['amount'].mean()
+    involved = pd.concat([
+        df[['sender', 'is_fraud']].rename(columns={'sender': 'wallet'}),
+        df[['receiver', 'is_fraud']].rename(columns={'receiver': 'wallet'}),
+    ])
+    fraud_flag = involved.groupby('wallet')['is_fraud'].max()
+
     # Create Node Features [In-degree, Out-degree, Avg_Amount, Wallet_Length, Is_Hub]
-    node_features = []
-    for wallet in all_wallets:
-        in_d = len(df[df['receiver'] == wallet])
-        out_d = len(df[df['sender'] == wallet])
-        avg_amt = df[df['sender'] == wallet]['amount'].mean()
-        avg_amt = avg_amt if pd.notna(avg_amt) else 0.0
-        is_hub = 1 if "HUB" in wallet else 0
-        node_features.append([float(in_d), float(out_d), float(avg_amt), float(len(wallet)), float(is_hub)])
+    # Built column-wise, one array per feature, in all_wallets order
+    wallets = pd.Index(all_wallets)
+    node_features = np.column_stack([
+        in_degree.reindex(wallets, fill_value=0).to_numpy(dtype=np.float32),
+        out_degree.reindex(wallets, fill_value=0).to_numpy(dtype=np.float32),
+        avg_sent.reindex(wallets).fillna(0.0).to_numpy(dtype=np.float32),
+        np.asarray(wallets.str.len(), dtype=np.float32),
+        np.asarray(wallets.str.contains("HUB", regex=False), dtype=np.float32),
+    ])
     
-    x = torch.tensor(node_features, dtype=torch.float)
+    x = torch.from_numpy(node_features)
     
     # Create Labels
-    labels = []
-    for wallet in all_wallets:
-        is_fraud = df[(df['sender'] == wallet) | (df['receiver'] == wallet)]['is_fraud'].max()
-        is_fraud = int(is_fraud) if pd.notna(is_fraud) else 0
-        labels.append(is_fraud)
+    labels = fraud_flag.reindex(wallets).fillna(0).to_numpy(dtype=np.int64)
     
     y = torch.tensor(labels, dtype=torch.long)
     
     return Data(x=x, edge_index=edge_index, y=y), le
 
-data, encoder = create_graph_data("algorand_fraud_dataset.csv")
-print(f"✓ Graph created: {data.num_nodes} nodes, {data.num_edges} edges, 5 features")
-
 # --- 3. Define Model ---
-print("\nStep 3: Training model...")
-
 class FraudGNN(torch.nn.Module):
     def __init__(self, in_channels=5, hidden_channels=16):
         super(FraudGNN, self).__init__()
@@ -102,31 +89,50 @@ class FraudGNN(torch.nn.Module):
         x = self.conv2(x, edge_index)
         return F.log_softmax(x, dim=1)
 
-# --- 4. Train Model ---
-model = FraudGNN(in_channels=5, hidden_channels=16)
-optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
-
-for epoch in range(50):
-    model.train()
-    optimizer.zero_grad()
-    out = model(data.x, data.edge_index)
-    loss = F.nll_loss(out, torch.tensor(data.y).long() if not isinstance(data.y, torch.Tensor) else data.y.long())
-    loss.backward()
-    optimizer.step()
+# Module-level definitions above are imported by main.py; the training run below
+# only executes when this file is run as a script.
+if __name__ == "__main__":
+    # --- 1. Generate Dataset ---
+    print("Step 1: Generating dataset...")
+    df = generate_dummy_data(210)
+    df.to_csv("algorand_fraud_dataset.csv", index=False)
+    print(f"✓ Dataset created: {len(df)} transactions")
+
+    # --- 2. Create Graph Data ---
+    print("\nStep 2: Converting to graph format...")
+    data, encoder = create_graph_data("algorand_fraud_dataset.csv")
+    print(f"✓ Graph created: {data.num_nodes} nodes, {data.num_edges} edges, 5 features")
+
+    # --- 4. Train Model ---
+    print("\nStep 3: Training model...")
+
+    model = FraudGNN(in_channels=5, hidden_channels=16)
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+
+    for epoch in range(50):
+        model.train()
+        optimizer.zero_grad()
+        out = model(data.x, data.edge_index)
+        loss = F.nll_loss(out, torch.tensor(data.y).long() if not isinstance(data.y, torch.Tensor) else data.y.long())
+        loss.backward()
+        optimizer.step()
     
-    if (epoch + 1) % 10 == 0:
-        print(f"  Epoch {epoch + 1}/50 - Loss: {loss.item():.4f}")
+        if (epoch + 1) % 10 == 0:
+            print(f"  Epoch {epoch + 1}/50 - Loss: {loss.item():.4f}")
+
+    print("✓ Model trained successfully")
 
-print("✓ Model trained successfully")
+    # --- 5. Save Model and Encoder ---
+    print("\nStep 4: Saving artifacts...")
 
-# --- 5. Save Model and Encoder ---
-print("\nStep 4: Saving artifacts...")
+    torch.save(model.state_dict(), "model.pt")
+    print("✓ Saved: model.pt")
 
-torch.save(model.state_dict(), "model.pt")
-print("✓ Saved: model.pt")
+    save_file(model.state_dict(), "model.safetensors")
+    print("✓ Saved: model.safetensors")
 
-with open("label_encoder.pkl", "wb") as f:
-    pickle.dump(encoder, f)
-print("✓ Saved: label_encoder.pkl")
+    with open("label_encoder.pkl", "wb") as f:
+        pickle.dump(encoder, f)
+    print("✓ Saved: label_encoder.pkl")
 
-print("\n✅ Training complete! You can now run: python main.py")
+    print("\n✅ Training complete! You can now run: python main.py")